@@ -6,10 +6,25 @@ from pocket_clinic_tools.triage_symptoms import triage_symptoms
 from pocket_clinic_tools.referral_dispatcher import send_referral
 
 class PocketClinicAgents:
-    def __init__(self):
-        self.OpenAIGPT4 = ChatOpenAI(name="gpt-4o", temperature=0.7)
+    def __init__(self, compact=False, timeout=None, max_retry_limit=2):
+        # timeout bounds each LLM call to what is left of the request deadline
+        self.OpenAIGPT4 = ChatOpenAI(name="gpt-4o", temperature=0.7, timeout=timeout)
+        # Compact mode trims backstories/goals, which are resent on every call
+        self.compact = compact
+        self.max_retry_limit = max_retry_limit
     
     def symptom_collector_agent(self):
+        if self.compact:
+            return Agent(
+                role="Symptom Collector Agent",
+                backstory="Extract IMCI symptoms with the tool.",
+                goal="Return the tool's symptom JSON unchanged.",
+                tools=[collect_symptoms],
+                allow_delegation=False,
+                max_retry_limit=self.max_retry_limit,
+                verbose=True,
+                llm=self.OpenAIGPT4,
+            )
         return Agent(
             role="Symptom Collector Agent",
             backstory=dedent("""
@@ -20,11 +35,23 @@ class PocketClinicAgents:
             goal="Given an audio clip or SMS text, produce a dict like {'fever': True, 'cough': False, ...}.",
             tools=[collect_symptoms],
             allow_delegation=False,
+            max_retry_limit=self.max_retry_limit,
             verbose=True,
             llm=self.OpenAIGPT4,
         )
 
     def triage_decision_agent(self):
+        if self.compact:
+            return Agent(
+                role="Triage Decision Agent",
+                backstory="Triage by WHO IMCI rules with the tool.",
+                goal="Return the tool's triage JSON unchanged.",
+                tools=[triage_symptoms],
+                allow_delegation=False,
+                max_retry_limit=self.max_retry_limit,
+                verbose=True,
+                llm=self.OpenAIGPT4,
+            )
         return Agent(
             role="Triage Decision Agent",
             backstory=dedent("""
@@ -41,11 +68,23 @@ class PocketClinicAgents:
             """),
             tools=[triage_symptoms],
             allow_delegation=False,
+            max_retry_limit=self.max_retry_limit,
             verbose=True,
             llm=self.OpenAIGPT4,
         )
 
     def referral_dispatcher_agent(self):
+        if self.compact:
+            return Agent(
+                role="Referral Dispatcher Agent",
+                backstory="Send the triage result by SMS with the tool.",
+                goal="Return the tool's result string.",
+                tools=[send_referral],
+                allow_delegation=False,
+                max_retry_limit=self.max_retry_limit,
+                verbose=True,
+                llm=self.OpenAIGPT4,
+            )
         return Agent(
             role="Referral Dispatcher Agent",
             backstory=dedent("""
@@ -59,6 +98,7 @@ class PocketClinicAgents:
             """),
             tools=[send_referral],
             allow_delegation=False,
+            max_retry_limit=self.max_retry_limit,
             verbose=True,
             llm=self.OpenAIGPT4,
         )
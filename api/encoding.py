@@ -0,0 +1,257 @@
+import gzip
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+
+# Below this size compression framing costs more than it saves
+MIN_COMPRESS_SIZE = 256
+# Cap on decompressed request bodies (audio uploads are at most 25 MB)
+MAX_BODY_SIZE = 32 * 1024 * 1024
+
+
+class EncodingError(ValueError):
+    """Request body could not be decompressed or decoded."""
+    status_code = 400
+
+
+class UnsupportedEncoding(EncodingError):
+    """Request uses a content coding or media type this server can't read."""
+    status_code = 415
+
+
+class BodyTooLarge(EncodingError):
+    """Compressed request body is larger than the server accepts."""
+    status_code = 413
+
+
+def _quality(params: list[str]) -> float:
+    for param in params:
+        name, _, value = param.replace(" ", "").partition("=")
+        if name == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def _tokens(header: str) -> list[str]:
+    """Media types / codings from an Accept-style header, skipping q=0 entries."""
+    tokens = []
+    for part in header.lower().split(","):
+        token, *params = [p.strip() for p in part.split(";")]
+        if token and _quality(params) > 0:
+            tokens.append(token)
+    return tokens
+
+
+def supported_encodings() -> list[str]:
+    return (["zstd"] if zstandard else []) + ["gzip"]
+
+
+def negotiate(accept: str = "", accept_encoding: str = "") -> tuple[str, str]:
+    """Pick (media_type, content_coding) for a response from the request headers."""
+    media_type = MSGPACK if msgpack and any(t in MSGPACK_TYPES for t in _tokens(accept)) else JSON
+    codings = _tokens(accept_encoding)
+    coding = next((c for c in supported_encodings() if c in codings), "identity")
+    return media_type, coding
+
+
+def compress(data: bytes, coding: str) -> bytes:
+    if coding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if coding == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+
+def _gunzip(data: bytes, limit: int) -> bytes:
+    # Bodies may hold several gzip members back to back; each must end cleanly
+    out = bytearray()
+    while True:
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        out += inflater.decompress(data, limit + 1 - len(out))
+        if len(out) > limit:
+            return bytes(out)
+        if not inflater.eof:
+            raise EncodingError("Incomplete gzip body")
+        data = inflater.unused_data
+        if not data:
+            return bytes(out)
+
+
+# One RLE block turns 4 bytes of input into up to 128 KB of output
+MAX_ZSTD_RATIO = 128 * 1024 // 4
+
+
+def _unzstd(data: bytes, limit: int) -> bytes:
+    # Bodies may hold several zstd frames back to back; each must end cleanly
+    dctx = zstandard.ZstdDecompressor()
+    parts: list[bytes] = []
+    total = 0
+    while data:
+        frame = dctx.decompressobj()
+        size = zstandard.frame_content_size(data)
+        if size > limit - total:
+            raise EncodingError(f"Decompressed body exceeds {limit} bytes")
+        if size >= 0:
+            # libzstd stops a frame that outgrows its declared size
+            parts.append(frame.decompress(data))
+            total += len(parts[-1])
+            rest = frame.unused_data
+        else:
+            # Size unknown: feed little enough input that no call can
+            # inflate far past the limit
+            view = memoryview(data)
+            pos = 0
+            while not frame.eof and pos < len(view):
+                step = max(1, (limit + 1 - total) // MAX_ZSTD_RATIO)
+                parts.append(frame.decompress(view[pos:pos + step]))
+                total += len(parts[-1])
+                pos += step
+                if total > limit:
+                    raise EncodingError(f"Decompressed body exceeds {limit} bytes")
+            rest = frame.unused_data + bytes(view[pos:])
+        if not frame.eof:
+            raise EncodingError("Incomplete zstd body")
+        data = rest
+    return parts[0] if len(parts) == 1 else b"".join(parts)
+
+
+def decompress(data: bytes, coding: str, limit: int = MAX_BODY_SIZE) -> bytes:
+    """Decompress a request body, refusing anything that inflates past `limit`."""
+    coding = coding.strip().lower()
+    if coding in ("", "identity"):
+        return data
+    if coding not in supported_encodings():
+        raise UnsupportedEncoding(f"Unsupported Content-Encoding: {coding}")
+    try:
+        out = _gunzip(data, limit) if coding == "gzip" else _unzstd(data, limit)
+    except EncodingError:
+        raise
+    except Exception as e:
+        raise EncodingError(f"Invalid {coding} body: {e}") from e
+    if len(out) > limit:
+        raise EncodingError(f"Decompressed body exceeds {limit} bytes")
+    return out
+
+
+def encode(data, media_type: str = JSON, coding: str = "identity") -> tuple[bytes, str]:
+    """
+    Serialize JSON-compatible data, compressing it when worthwhile.
+    Returns the body and the content coding actually applied.
+    """
+    if media_type == MSGPACK:
+        body = msgpack.packb(data, use_bin_type=True)
+    else:
+        body = json.dumps(data, separators=(",", ":")).encode()
+    if coding == "identity" or len(body) < MIN_COMPRESS_SIZE:
+        return body, "identity"
+    return compress(body, coding), coding
+
+
+def decode(body: bytes, media_type: str = JSON, coding: str = "identity"):
+    body = decompress(body, coding)
+    try:
+        if media_type in MSGPACK_TYPES:
+            if msgpack is None:
+                raise UnsupportedEncoding("MessagePack is not available")
+            return msgpack.unpackb(body, raw=False)
+        return json.loads(body)
+    except EncodingError:
+        raise
+    except Exception as e:
+        raise EncodingError(f"Invalid {media_type} body: {e}") from e
+
+
+class CompactRequestMiddleware:
+    """
+    ASGI middleware that lets gateways send compact request bodies.
+
+    gzip/zstd bodies (JSON or multipart audio uploads) are decompressed and
+    MessagePack bodies are converted to JSON before the route sees them, so
+    endpoints and their Pydantic models are unchanged.
+    """
+
+    def __init__(self, app, max_body_size: int = MAX_BODY_SIZE):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def _read_body(self, headers: dict, receive) -> bytes:
+        """Buffer the compressed body, refusing it as soon as it is too large."""
+        try:
+            declared = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            raise EncodingError("Invalid Content-Length") from None
+        if declared > self.max_body_size:
+            raise BodyTooLarge(f"Request body exceeds {self.max_body_size} bytes")
+        chunks = []
+        size = 0
+        more = True
+        while more:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_size:
+                raise BodyTooLarge(f"Request body exceeds {self.max_body_size} bytes")
+            chunks.append(chunk)
+            more = message.get("more_body", False)
+        return b"".join(chunks)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = {k.lower(): v for k, v in scope["headers"]}
+        coding = headers.get(b"content-encoding", b"identity").decode().strip().lower()
+        content_type = headers.get(b"content-type", b"").decode().split(";")[0].strip().lower()
+        is_msgpack = content_type in MSGPACK_TYPES
+        if coding in ("", "identity") and not is_msgpack:
+            return await self.app(scope, receive, send)
+
+        try:
+            body = decompress(await self._read_body(headers, receive), coding)
+            if is_msgpack:
+                body = json.dumps(decode(body, content_type)).encode()
+        except EncodingError as e:
+            payload = json.dumps({"status": "error", "message": str(e), "details": None}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": e.status_code,
+                "headers": [(b"content-type", JSON.encode()), (b"content-length", str(len(payload)).encode())],
+            })
+            await send({"type": "http.response.body", "body": payload})
+            return
+
+        rewritten = [
+            (k, v) for k, v in scope["headers"]
+            if k.lower() not in (b"content-encoding", b"content-length")
+            and not (is_msgpack and k.lower() == b"content-type")
+        ]
+        rewritten.append((b"content-length", str(len(body)).encode()))
+        if is_msgpack:
+            rewritten.append((b"content-type", JSON.encode()))
+
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(dict(scope, headers=rewritten), replay, send)
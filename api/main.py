@@ -1,15 +1,27 @@
 from fastapi import FastAPI, Request, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
 from typing import Optional
+import ast
+import json
 import logging
+import re
 import time
 import os
 import tempfile
 from dotenv import load_dotenv
+from twilio.request_validator import RequestValidator
 
-from api.models import PocketClinicRequest, PocketClinicResponse, ErrorResponse
+from api import encoding
+from api.models import (
+    PocketClinicRequest, PocketClinicResponse, ErrorResponse, MinimalResponse, URGENCY_CODES,
+)
+from api.sms_queue import SmsQueue
 from main import PocketClinicCrew
+from pocket_clinic_tools import resilience
 
 # Load environment variables
 load_dotenv()
@@ -34,6 +46,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Accept gzip/zstd and MessagePack request bodies from field gateways
+app.add_middleware(encoding.CompactRequestMiddleware)
+
 # Add request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -70,6 +85,107 @@ async def log_requests(request: Request, call_next):
             ).dict()
         )
 
+# Empty TwiML: acknowledge without replying; the referral SMS is sent after triage
+EMPTY_TWIML = '<?xml version="1.0" encoding="UTF-8"?><Response></Response>'
+
+
+def triage_sms(message: dict):
+    """Background triage for one inbound SMS; the referral goes back to the sender."""
+    logger.info(f"Processing SMS from {message['from']}")
+    crew = PocketClinicCrew(
+        text_message=message["body"],
+        audio_file=None,
+        phone_number=message["from"]
+    )
+    crew.run()
+
+
+sms_queue = SmsQueue(
+    triage_sms,
+    maxsize=int(os.getenv("POCKETCLINIC_SMS_QUEUE_SIZE", "1000")),
+    spill_path=os.getenv("POCKETCLINIC_SMS_SPILL_PATH"),
+    workers=int(os.getenv("POCKETCLINIC_SMS_WORKERS", "2")),
+)
+
+
+@app.on_event("startup")
+async def start_sms_queue():
+    sms_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_sms_queue():
+    sms_queue.stop()
+
+def task_output_dict(output) -> Optional[dict]:
+    """A task's structured output: its JSON dict, or its raw text parsed as JSON or a dict literal."""
+    if getattr(output, "json_dict", None):
+        return output.json_dict
+    raw = getattr(output, "raw", "").strip().removeprefix("```json").strip("`").strip()
+    for parse in (json.loads, ast.literal_eval):
+        try:
+            value = parse(raw)
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            continue
+        return value if isinstance(value, dict) else None
+    return None
+
+
+def minimal_response(result) -> MinimalResponse:
+    """Reduce a crew result to its urgency code and referral SID."""
+    if isinstance(result, dict):
+        # Rule-based fallback: the triage tool's own dict
+        triage, referral = result.get("triage"), str(result.get("referral", ""))
+    else:
+        # Crew run: collect, triage, dispatch
+        outputs = getattr(result, "tasks_output", [])
+        triage = task_output_dict(outputs[1]) if len(outputs) > 1 else None
+        referral = getattr(outputs[-1], "raw", "") if outputs else ""
+    urgency = str(triage.get("urgency", "")).lower() if isinstance(triage, dict) else ""
+    sid = re.search(r"SID:\s*(\w+)", referral)
+    return MinimalResponse(
+        s="error" if isinstance(result, dict) and "error" in result else "success",
+        u=URGENCY_CODES.get(urgency),
+        id=sid.group(1) if sid else None,
+    )
+
+
+def encoded_response(http_request: Request, model: BaseModel, status_code: int = 200) -> Response:
+    """
+    Encode a response model as negotiated by the client: MessagePack or JSON
+    (Accept), zstd or gzip (Accept-Encoding).
+    """
+    media_type, coding = encoding.negotiate(
+        http_request.headers.get("accept", ""),
+        http_request.headers.get("accept-encoding", ""),
+    )
+    body, coding = encoding.encode(jsonable_encoder(model, by_alias=True), media_type, coding)
+    headers = {"Vary": "Accept, Accept-Encoding, Prefer"}
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type=media_type, headers=headers, status_code=status_code)
+
+
+def wants_minimal(http_request: Request) -> bool:
+    return "return=minimal" in http_request.headers.get("prefer", "").lower()
+
+
+# HTTP status for each error cause a crew run reports; anything else is a 500
+ERROR_STATUS = {"input": 400, "transcription": 502, "upstream": 502, "deadline": 504}
+
+
+def crew_response(http_request: Request, result, usage: dict) -> Response:
+    """Response for a finished crew run, in the profile and encoding the client asked for."""
+    failed = isinstance(result, dict) and "error" in result
+    status_code = ERROR_STATUS.get(result.get("cause"), 500) if failed else 200
+    if wants_minimal(http_request):
+        return encoded_response(http_request, minimal_response(result), status_code)
+    return encoded_response(http_request, PocketClinicResponse(
+        status="error" if failed else "success",
+        message=result["error"] if failed else "Request processed successfully",
+        details={"result": result, "usage": usage}
+    ), status_code)
+
 # Root endpoint
 @app.get("/", tags=["Root"])
 async def root():
@@ -82,11 +198,42 @@ async def root():
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 async def health_check():
-    return {"status": "healthy"}
+    # Breaker state, hedge and timeout counters for each upstream
+    return {"status": "healthy", "upstreams": resilience.snapshot(), "sms_queue": sms_queue.stats()}
+
+def valid_twilio_signature(url: str, params: dict, signature: str) -> bool:
+    """Check X-Twilio-Signature against TWILIO_TOKEN; unsigned requests never pass."""
+    token = os.getenv("TWILIO_TOKEN")
+    if not token or not signature:
+        return False
+    return RequestValidator(token).validate(url, params, signature)
+
+# Inbound SMS webhook (Twilio-style, form-encoded)
+@app.post("/webhooks/sms", tags=["Webhooks"])
+async def sms_webhook(
+    http_request: Request,
+    sender: str = Form(..., alias="From"),
+    body: str = Form("", alias="Body"),
+):
+    """
+    Receive an inbound SMS from the provider
+
+    The message is queued for background triage and the provider gets an
+    empty TwiML response straight away, so bursts never time out its callback.
+    Requests without a valid Twilio signature are rejected with 403.
+    """
+    # Behind a proxy the URL Twilio signed differs from the one we see
+    url = os.getenv("POCKETCLINIC_SMS_WEBHOOK_URL") or str(http_request.url)
+    form = await http_request.form()
+    if not valid_twilio_signature(url, dict(form), http_request.headers.get("X-Twilio-Signature", "")):
+        logger.warning(f"Rejected SMS webhook call with an invalid signature from {sender}")
+        raise HTTPException(status_code=403, detail="Invalid Twilio signature")
+    sms_queue.put(sender, body)
+    return Response(content=EMPTY_TWIML, media_type="application/xml")
 
 # Main PocketClinic endpoint for text input
 @app.post("/api/v1/process", response_model=PocketClinicResponse, tags=["PocketClinic"])
-async def process_request(request: PocketClinicRequest):
+async def process_request(request: PocketClinicRequest, http_request: Request):
     """
     Process a request with text input
     
@@ -95,7 +242,8 @@ async def process_request(request: PocketClinicRequest):
     2. Triage the symptoms
     3. Dispatch a referral via SMS
     
-    Returns the result of the entire process.
+    Returns the result of the entire process. Send `Prefer: return=minimal`
+    for just the urgency code and referral SID.
     """
     try:
         logger.info(f"Processing text request for {request.phone_number}")
@@ -107,15 +255,11 @@ async def process_request(request: PocketClinicRequest):
             phone_number=request.phone_number
         )
         
-        # Run the crew
-        result = crew.run()
+        # Run the crew off the event loop so webhook acks aren't held up behind it
+        result = await run_in_threadpool(crew.run)
         
         # Return response
-        return PocketClinicResponse(
-            status="success",
-            message="Request processed successfully",
-            details={"result": result}
-        )
+        return crew_response(http_request, result, crew.usage)
     except Exception as e:
         logger.error(f"Error processing text request: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
@@ -123,6 +267,7 @@ async def process_request(request: PocketClinicRequest):
 # Main PocketClinic endpoint for audio input
 @app.post("/api/v1/process/audio", response_model=PocketClinicResponse, tags=["PocketClinic"])
 async def process_audio_request(
+    http_request: Request,
     phone_number: str = Form(...),
     audio_file: UploadFile = File(...),
 ):
@@ -134,7 +279,8 @@ async def process_audio_request(
     2. Triage the symptoms
     3. Dispatch a referral via SMS
     
-    Returns the result of the entire process.
+    Returns the result of the entire process. Send `Prefer: return=minimal`
+    for just the urgency code and referral SID.
     """
     try:
         logger.info(f"Processing audio request for {phone_number}")
@@ -156,15 +302,11 @@ async def process_audio_request(
                 phone_number=phone_number
             )
             
-            # Run the crew
-            result = crew.run()
+            # Run the crew off the event loop so webhook acks aren't held up behind it
+            result = await run_in_threadpool(crew.run)
             
             # Return response
-            return PocketClinicResponse(
-                status="success",
-                message="Request processed successfully",
-                details={"result": result}
-            )
+            return crew_response(http_request, result, crew.usage)
         finally:
             # Clean up temporary file
             if os.path.exists(temp_path):
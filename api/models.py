@@ -21,3 +21,14 @@ class ErrorResponse(BaseModel):
     status: str = Field("error", description="Error status")
     message: str = Field(..., description="Error message")
     details: Optional[dict] = Field(None, description="Additional error details")
+
+
+# Single-digit urgency codes used by the minimal response profile
+URGENCY_CODES = {"low": 1, "moderate": 2, "critical": 3}
+
+
+class MinimalResponse(BaseModel):
+    """Minimal response profile for low-bandwidth gateways (Prefer: return=minimal)"""
+    status: str = Field(..., alias="s", description="Status of the request (success or error)")
+    urgency: Optional[int] = Field(None, alias="u", description="Urgency code: 1 low, 2 moderate, 3 critical")
+    referral_id: Optional[str] = Field(None, alias="id", description="SID of the referral SMS")
@@ -0,0 +1,212 @@
+from collections import deque
+from typing import Callable, Optional
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; the spill file is then unlocked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class SmsQueue:
+    """
+    Bounded in-memory queue of inbound SMS with spill to disk.
+
+    `put` never blocks on triage: messages go to memory until `maxsize` is
+    reached, then are appended to a JSON-lines spill file. While anything is
+    spilled, new messages are spilled too so delivery stays first-in,
+    first-out. Worker threads drain memory first, then the spill file.
+
+    On `stop`, messages still queued or still being handled are written to
+    the spill file, and a spill file left over from a previous run is picked
+    up on `start`, so queued messages survive a restart (they may be
+    processed twice if a handler finishes after `stop` gave up on it, or if
+    the process died mid-drain).
+
+    The spill file is locked while open. If another process (e.g. a sibling
+    server worker) already holds it, this queue spills to a copy suffixed
+    with its pid instead, so no two processes drain the same file. `start`
+    adopts pid-suffixed copies whose process has exited.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[dict], None],
+        maxsize: int = 1000,
+        spill_path: Optional[str] = None,
+        workers: int = 2,
+    ):
+        self._handler = handler
+        self.maxsize = maxsize
+        self.spill_path = spill_path or os.path.join(tempfile.gettempdir(), "pocketclinic_sms_spill.jsonl")
+        self._base_path = self.spill_path
+        self.workers = workers
+        self._memory: deque = deque()
+        # Taken by a worker but not yet handled, keyed by id(message)
+        self._inflight: dict[int, dict] = {}
+        self._spill = None
+        self._spill_offset = 0
+        self._spilled = 0
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._stopping = False
+        self.counters = {"received": 0, "spilled": 0, "processed": 0, "failed": 0}
+
+    @staticmethod
+    def _lock_spill(path: str):
+        """Open `path` for spilling, or return None if another owner holds its lock."""
+        spill = open(path, "a+b")
+        if fcntl is not None:
+            try:
+                fcntl.flock(spill, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                spill.close()
+                return None
+        return spill
+
+    def _open_spill(self):
+        if self._spill is None:
+            self._spill = self._lock_spill(self.spill_path)
+            if self._spill is None:
+                root, ext = os.path.splitext(self._base_path)
+                logger.warning(f"SMS spill file {self._base_path} is in use; spilling to a per-process file")
+                self.spill_path = f"{root}.{os.getpid()}{ext}"
+                self._spill = self._lock_spill(self.spill_path)
+                if self._spill is None:
+                    raise RuntimeError(f"SMS spill file {self.spill_path} is in use")
+            self._spill.seek(0)
+            self._spilled = sum(1 for line in self._spill if line.strip())
+            self._spill_offset = 0
+
+    def _adopt_orphans(self):
+        """Move pid-suffixed spill files of exited processes into this queue's spill."""
+        root, ext = os.path.splitext(self._base_path)
+        orphans = [
+            path for path in sorted(glob.glob(f"{glob.escape(root)}.*{ext}"))
+            if path[len(root) + 1:len(path) - len(ext)].isdigit()
+        ]
+        if not orphans:
+            return
+        self._open_spill()
+        for path in orphans:
+            if path == self.spill_path:
+                continue
+            orphan = self._lock_spill(path)
+            if orphan is None:
+                continue  # its process is still running
+            with orphan:
+                orphan.seek(0)
+                lines = [line.rstrip(b"\n") + b"\n" for line in orphan if line.strip()]
+                self._spill.seek(0, os.SEEK_END)
+                self._spill.writelines(lines)
+                self._spill.flush()
+                self._spilled += len(lines)
+                # Unlink while still holding the lock so no one else adopts it too
+                os.remove(path)
+            logger.info(f"Adopted {len(lines)} queued SMS from {path}")
+
+    def put(self, sender: str, body: str):
+        message = {"from": sender, "body": body, "received_at": time.time()}
+        with self._cond:
+            self.counters["received"] += 1
+            if self._spilled == 0 and len(self._memory) < self.maxsize:
+                self._memory.append(message)
+            else:
+                self._open_spill()
+                self._spill.seek(0, os.SEEK_END)
+                self._spill.write(json.dumps(message).encode() + b"\n")
+                self._spill.flush()
+                self._spilled += 1
+                self.counters["spilled"] += 1
+            self._cond.notify()
+
+    def _take(self, timeout: float = 0.5) -> Optional[dict]:
+        with self._cond:
+            while not self._memory and not self._spilled:
+                if self._stopping or not self._cond.wait(timeout):
+                    return None
+            if self._memory:
+                message = self._memory.popleft()
+            else:
+                self._spill.seek(self._spill_offset)
+                line = self._spill.readline()
+                self._spill_offset = self._spill.tell()
+                self._spilled -= 1
+                if self._spilled == 0:
+                    # Fully drained: reset the file so it doesn't grow forever
+                    self._spill.truncate(0)
+                    self._spill_offset = 0
+                message = json.loads(line)
+            self._inflight[id(message)] = message
+            return message
+
+    def _work(self):
+        while not self._stopping:
+            message = self._take()
+            if message is None:
+                continue
+            try:
+                self._handler(message)
+                outcome = "processed"
+            except Exception as e:
+                outcome = "failed"
+                logger.error(f"Error processing SMS from {message['from']}: {str(e)}")
+            with self._cond:
+                self._inflight.pop(id(message), None)
+                self.counters[outcome] += 1
+
+    def start(self):
+        with self._cond:
+            self._stopping = False
+            if os.path.exists(self.spill_path):
+                self._open_spill()
+            self._adopt_orphans()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"sms-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        with self._cond:
+            if not self._memory and not self._inflight and self._spill is None:
+                return
+            # Persist what is left, oldest first, for the next start: messages
+            # workers didn't finish, then memory, then the unread spill
+            self._open_spill()
+            self._spill.seek(self._spill_offset)
+            rest = self._spill.read()
+            self._spill.truncate(0)
+            for message in [*self._inflight.values(), *self._memory]:
+                self._spill.write(json.dumps(message).encode() + b"\n")
+            self._spill.write(rest)
+            if self.spill_path != self._base_path and self._spill.tell() == 0:
+                os.remove(self.spill_path)  # nothing left for anyone to adopt
+            self._spill.close()
+            self._spill = None
+            self.spill_path = self._base_path
+            self._inflight.clear()
+            self._memory.clear()
+            self._spilled = 0
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "in_memory": len(self._memory),
+                "in_flight": len(self._inflight),
+                "on_disk": self._spilled,
+                **self.counters,
+            }
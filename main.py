@@ -2,6 +2,7 @@
 import os
 import sys
 import base64
+import threading
 from dotenv import load_dotenv
 from pocket_clinic_tools.audio_utils import preprocess_audio
 
@@ -11,20 +12,76 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), ".")))
 from crewai import Crew
 from agents import PocketClinicAgents
 from tasks import PocketClinicTasks
+from token_budget import TokenLedger, TokenBudgetExceeded, default_token_budget
+from pocket_clinic_tools.symptom_collector import collect_symptoms, transcribe_audio
+from pocket_clinic_tools.triage_symptoms import triage_symptoms
+from pocket_clinic_tools.referral_dispatcher import send_referral
+from pocket_clinic_tools.resilience import (
+    DeadlineExceeded, UpstreamUnavailable, default_request_timeout, get_guard,
+    remaining_time, request_deadline,
+)
+
+# Crew runs send SMS, so they are never hedged; a budget abort is not an upstream fault
+_llm = get_guard("llm", timeout=default_request_timeout(), passthrough=(TokenBudgetExceeded,))
+
+
+def _crew_usage(crew):
+    """Cumulative (prompt_tokens, completion_tokens) the crew has spent so far."""
+    usage = crew.calculate_usage_metrics()
+    return usage.prompt_tokens, usage.completion_tokens
+
 
 class PocketClinicCrew:
-    def __init__(self, text_message=None, audio_file=None, phone_number=None):
+    def __init__(self, text_message=None, audio_file=None, phone_number=None,
+                 compact_prompts=None, token_budget=None, request_timeout=None):
         self.text_message = text_message
         self.audio_file = audio_file
         self.phone_number = phone_number
+        if compact_prompts is None:
+            compact_prompts = os.getenv("POCKETCLINIC_COMPACT_PROMPTS", "").lower() in ("1", "true", "yes")
+        self.compact_prompts = compact_prompts
+        self.ledger = TokenLedger(token_budget if token_budget is not None else default_token_budget())
+        self.request_timeout = request_timeout or default_request_timeout()
+
+    @property
+    def usage(self):
+        return self.ledger.summary()
+
+    def run_local(self, audio_b64=None, reason=None, text_message=None):
+        """
+        Rule-based fallback: run the tools directly with no LLM agents.
+        Used when the token budget is exceeded or the LLM upstream is unhealthy.
+        """
+        symptoms = collect_symptoms.run(audio_clip=audio_b64, text_message=text_message or self.text_message)
+        if "error" in symptoms:
+            return {**symptoms, "cause": "transcription" if audio_b64 else "input"}
+        triage = triage_symptoms.run(**{k: v for k, v in symptoms.items() if k != "confidence"})
+        summary = f"{triage['urgency'].capitalize()} urgency. {triage['recommendation']}"
+        referral = send_referral.run(phone_number=self.phone_number, triage_summary=summary)
+        return {
+            "symptoms": symptoms,
+            "triage": triage,
+            "referral": referral,
+            "fallback": reason,
+        }
 
     def run(self):
     # 1) Load environment
         load_dotenv()
 
-        # 2) Instantiate agents & tasks
-        agents = PocketClinicAgents()
-        tasks = PocketClinicTasks()
+        # Every upstream call in this run derives its deadline from the request budget
+        with request_deadline(self.request_timeout):
+            return self._run()
+
+    def _run(self):
+        # 2) Instantiate agents & tasks. Under a token budget agents must not
+        #    retry a task the budget check aborted, or the budget isn't hard
+        agents = PocketClinicAgents(
+            compact=self.compact_prompts,
+            timeout=remaining_time(self.request_timeout),
+            max_retry_limit=0 if self.ledger.budget is not None else 2,
+        )
+        tasks = PocketClinicTasks(compact=self.compact_prompts)
 
         collector_agent   = agents.symptom_collector_agent()
         triage_agent      = agents.triage_decision_agent()
@@ -32,15 +89,24 @@ class PocketClinicCrew:
 
         # 3) Prepare audio if provided
         audio_b64 = None
+        text_message = self.text_message
         if self.audio_file:
             # ✅ Preprocess the audio before sending to the LLM
             cleaned_audio_path = preprocess_audio(self.audio_file)
             with open(cleaned_audio_path, "rb") as f:
-                audio_b64 = base64.b64encode(f.read()).decode("utf-8")
+                audio = f.read()
+            if self.compact_prompts:
+                # The base64 clip would dwarf every other prompt token, and the
+                # agent would have to echo it back; hand the crew a transcript
+                text_message = transcribe_audio(audio)
+                if text_message is None:
+                    return {"error": "Transcription unavailable.", "cause": "transcription"}
+            else:
+                audio_b64 = base64.b64encode(audio).decode("utf-8")
                 # 4) Build tasks with proper output chaining
         collect_task = tasks.collect_symptoms_task(
             collector_agent,
-            text_message=self.text_message,
+            text_message=text_message,
             audio_clip_b64=audio_b64
         )
 
@@ -55,13 +121,88 @@ class PocketClinicCrew:
             triage_summary=triage_task.output  # 👈 use output of triage as input
         )
 
-        # 5) Create & run the Crew
-        crew = Crew(
-            agents=[collector_agent, triage_agent, dispatcher_agent],
-            tasks=[collect_task, triage_task, dispatch_task],
-            verbose=True,
-        )
-        return crew.kickoff()
+        all_agents = [collector_agent, triage_agent, dispatcher_agent]
+        all_tasks = [collect_task, triage_task, dispatch_task]
+
+        # The crew thread (callbacks) and this thread (giving up on the crew)
+        # both read the task progress; the lock makes "fall back or not" a
+        # single decision
+        lock = threading.Lock()
+        state = {"done": 0, "abandoned": False}
+        crew = None
+
+        # Once dispatch has started the SMS may already be out, so let it
+        # finish rather than falling back and sending a second one
+        def dispatch_started():
+            return state["done"] >= len(all_tasks) - 1
+
+        # 5) Token accounting: attribute the crew's spend since the last task
+        #    to the task that just finished, and abort once over budget
+        def record_task(output):
+            with lock:
+                self.ledger.record_delta(output.agent, output.description[:60], *_crew_usage(crew))
+                state["done"] += 1
+                # Task callbacks run between tasks, so an abandoned run stops
+                # here before dispatch gets a chance to send anything
+                if state["abandoned"]:
+                    raise UpstreamUnavailable("crew run abandoned")
+
+        def refresh_timeouts():
+            # The LLM reads its timeout on every call; keep each call inside
+            # the request deadline (0 would mean no timeout at all)
+            timeout = max(remaining_time(self.request_timeout), 1.0)
+            for agent in all_agents:
+                if hasattr(agent.llm, "timeout"):
+                    agent.llm.timeout = timeout
+
+        def check_budget(_step):
+            refresh_timeouts()
+            with lock:
+                if state["abandoned"]:
+                    raise UpstreamUnavailable("crew run abandoned")
+                # Enforced through dispatch too; give_up won't fall back then
+                self.ledger.check(sum(_crew_usage(crew)))
+
+        def give_up(reason):
+            with lock:
+                fallback = not dispatch_started()
+                state["abandoned"] = fallback
+                if crew is not None:
+                    # Charge what the interrupted task spent to its agent
+                    agent = all_tasks[min(state["done"], len(all_tasks) - 1)].agent
+                    self.ledger.record_delta(agent.role, "aborted", *_crew_usage(crew))
+            if not fallback:
+                if isinstance(reason, DeadlineExceeded):
+                    cause = "deadline"
+                elif isinstance(reason, TokenBudgetExceeded):
+                    cause = "budget"
+                else:
+                    cause = "upstream"
+                return {"error": f"{reason} after triage; referral may still be delivered", "cause": cause}
+            print(f"[WARN] {reason}; falling back to rule-based triage")
+            return self.run_local(audio_b64, reason=str(reason), text_message=text_message)
+
+        def kickoff(_timeout):
+            refresh_timeouts()
+            return crew.kickoff()
+
+        try:
+            self.ledger.estimate(
+                *(f"{a.role} {a.backstory} {a.goal}" for a in all_agents),
+                *(f"{t.description} {t.expected_output}" for t in all_tasks),
+            )
+
+            # 6) Create & run the Crew
+            crew = Crew(
+                agents=all_agents,
+                tasks=all_tasks,
+                verbose=True,
+                step_callback=check_budget,
+                task_callback=record_task,
+            )
+            return _llm.call(kickoff)
+        except (TokenBudgetExceeded, UpstreamUnavailable) as e:
+            return give_up(e)
 
 
 if __name__ == "__main__":
@@ -82,3 +223,5 @@ if __name__ == "__main__":
 
     print("\n== Crew Run Result ==")
     print(result)
+    print("\n== Token Usage ==")
+    print(crew.usage)
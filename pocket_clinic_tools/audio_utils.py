@@ -1,7 +1,11 @@
 from pydub import AudioSegment
 from pydub.silence import split_on_silence
+import json
+import os
 import tempfile
 
+_vosk_model = None
+
 def preprocess_audio(audio_path: str) -> str:
     # Load the audio file
     audio = AudioSegment.from_file(audio_path)
@@ -29,3 +33,25 @@ def preprocess_audio(audio_path: str) -> str:
     tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
     cleaned_audio.export(tmp_file.name, format="wav")
     return tmp_file.name
+
+
+def transcribe_offline(audio_path: str) -> str | None:
+    """
+    Transcribe locally with Vosk, for when the OpenAI upstream is unavailable.
+    Returns None if no model is configured via VOSK_MODEL_PATH.
+    """
+    global _vosk_model
+    model_path = os.getenv("VOSK_MODEL_PATH")
+    if not model_path or not os.path.isdir(model_path):
+        return None
+
+    from vosk import KaldiRecognizer, Model
+
+    if _vosk_model is None:
+        _vosk_model = Model(model_path)
+
+    # Vosk expects 16 kHz mono 16-bit PCM
+    audio = AudioSegment.from_file(audio_path).set_channels(1).set_frame_rate(16000).set_sample_width(2)
+    recognizer = KaldiRecognizer(_vosk_model, 16000)
+    recognizer.AcceptWaveform(audio.raw_data)
+    return json.loads(recognizer.FinalResult()).get("text", "")
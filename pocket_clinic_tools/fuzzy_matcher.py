@@ -0,0 +1,179 @@
+# pocket_clinic_tools/fuzzy_matcher.py
+
+import re
+from functools import lru_cache
+
+# Symptom vocabulary keyed by the same names collect_symptoms returns.
+# Multi-word phrases are matched word by word against consecutive tokens.
+SYMPTOM_TERMS: dict[str, list[str]] = {
+    "fever":                ["fever", "feverish", "hot", "temperature"],
+    "cough":                ["cough", "coughing", "cof", "coff"],
+    "difficulty_breathing": ["difficulty breathing", "shortness of breath", "breathless"],
+    "diarrhea":             ["diarrhea", "diarrhoea", "loose stools"],
+}
+
+# Real English words within edit distance of a symptom term. They are taken
+# at face value and never fuzzy-matched ("fewer" is not "fever").
+COMMON_WORDS = frozenset({
+    "fewer", "fiver", "fevers", "couch", "coach", "coughs",
+    "breathe", "breathes", "temperate", "temperance", "diaries", "diary",
+})
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+
+def _max_distance(length: int) -> int:
+    """Edit distance tolerated for a word of the given length."""
+    if length <= 4:
+        return 0
+    if length <= 7:
+        return 1
+    return 2
+
+
+def _query_depth(length: int) -> int:
+    """
+    Deletes worth generating for a token: a token can only reach words whose
+    tolerated distance covers the length gap, so short tokens need few.
+    """
+    if length <= 3:
+        return 0
+    if length <= 5:
+        return 1
+    return 2
+
+
+def _deletes(word: str, depth: int) -> set[str]:
+    """
+    All variants of `word` with up to `depth` characters removed.
+    The first character is never deleted, so fuzzy hits always share it
+    with the vocabulary word ("tough" never becomes "cough").
+    """
+    variants = {word}
+    frontier = [word]
+    for _ in range(depth):
+        nxt = []
+        for w in frontier:
+            for i in range(1, len(w)):
+                d = w[:i] + w[i + 1:]
+                if d not in variants:
+                    variants.add(d)
+                    nxt.append(d)
+        frontier = nxt
+    return variants
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Damerau-Levenshtein (optimal string alignment) distance."""
+    # Shared prefix/suffix never changes the distance; trimming leaves a tiny DP
+    while a and b and a[0] == b[0]:
+        a, b = a[1:], b[1:]
+    while a and b and a[-1] == b[-1]:
+        a, b = a[:-1], b[:-1]
+    if not a or not b:
+        return len(a) + len(b)
+    prev2: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class FuzzyTermMatcher:
+    """
+    Misspelling-tolerant term matcher backed by a precomputed deletion index
+    (SymSpell-style).
+
+    Every vocabulary word is stored under all of its deletion variants, so a
+    token lookup only generates the token's own deletes and probes a dict,
+    instead of comparing against every term in the vocabulary.
+    """
+
+    def __init__(self, terms: dict[str, list[str]] = SYMPTOM_TERMS, min_confidence: float = 0.75,
+                 common_words: frozenset[str] = COMMON_WORDS, cache_size: int = 8192):
+        self.min_confidence = min_confidence
+        self.common_words = common_words
+        self._phrases: dict[str, list[tuple[str, tuple[str, ...]]]] = {}
+        self._index: dict[str, set[str]] = {}
+
+        for key, phrases in terms.items():
+            for phrase in phrases:
+                words = tuple(phrase.lower().split())
+                self._phrases.setdefault(words[0], []).append((key, words))
+                for word in words:
+                    for variant in _deletes(word, _max_distance(len(word))):
+                        self._index.setdefault(variant, set()).add(word)
+
+        # Cheap reject before generating deletes: fuzzy hits share the first
+        # letter and are within the word's tolerated distance in length
+        self._fuzzy_lengths: dict[str, set[int]] = {}
+        for word in {w for ws in self._index.values() for w in ws}:
+            limit = _max_distance(len(word))
+            if limit:
+                lengths = self._fuzzy_lengths.setdefault(word[0], set())
+                lengths.update(range(len(word) - limit, len(word) + limit + 1))
+        # LRU so names and numbers in real traffic don't crowd out common tokens
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _lookup(self, token: str) -> tuple[str, int] | None:
+        """
+        Return (vocabulary_word, edit_distance) for the closest word within
+        its tolerated distance, or None when nothing is close enough.
+        """
+        words = self._index.get(token)
+        if words and token in words:
+            return (token, 0)
+        if token in self.common_words or len(token) not in self._fuzzy_lengths.get(token[0], ()):
+            return None
+
+        # Probe the index while generating the token's deletes (first letter
+        # kept), instead of materialising the full delete set
+        index = self._index
+        candidates = set(index.get(token, ()))
+        depth = _query_depth(len(token))
+        for i in range(1, len(token) if depth else 0):
+            once = token[:i] + token[i + 1:]
+            candidates.update(index.get(once, ()))
+            if depth > 1:
+                for j in range(i, len(once)):
+                    candidates.update(index.get(once[:j] + once[j + 1:], ()))
+
+        best: tuple[str, int] | None = None
+        for word in candidates:
+            limit = _max_distance(len(word))
+            if abs(len(word) - len(token)) > limit:
+                continue
+            dist = _edit_distance(token, word)
+            if dist <= limit and (best is None or dist < best[1]):
+                best = (word, dist)
+        return best
+
+    def match(self, text: str) -> dict[str, float]:
+        """
+        Find vocabulary terms in free text.
+
+        Returns:
+          A dict mapping each matched key to its best confidence in (0, 1],
+          where 1.0 is an exact match and lower values reflect edit distance
+          relative to the matched term's length.
+        """
+        hits = [self.lookup(tok) for tok in _TOKEN_RE.findall(text.lower())]
+        words = [hit[0] if hit else None for hit in hits]
+
+        found: dict[str, float] = {}
+        for start, word in enumerate(words):
+            for key, phrase in self._phrases.get(word, ()) if word else ():
+                end = start + len(phrase)
+                if tuple(words[start:end]) != phrase:
+                    continue
+                dist = sum(hit[1] for hit in hits[start:end] if hit)
+                confidence = 1.0 - dist / sum(len(w) for w in phrase)
+                if confidence >= self.min_confidence and confidence > found.get(key, 0.0):
+                    found[key] = confidence
+        return found
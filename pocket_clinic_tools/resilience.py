@@ -0,0 +1,296 @@
+# pocket_clinic_tools/resilience.py
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("pocketclinic_deadline", default=None)
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream call could not be completed; callers should fall back."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """The circuit breaker is open, so the call was not attempted."""
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """No attempt finished before the call's deadline."""
+
+
+def is_upstream_error(exc: BaseException) -> bool:
+    """
+    Whether an error says the upstream is unhealthy: timeouts, connection
+    failures, rate limits and 5xx responses. Client errors (4xx) and bugs in
+    our own code don't count against the circuit breaker.
+    """
+    if isinstance(exc, (TimeoutError, ConnectionError, UpstreamUnavailable)):
+        return True
+    if openai is not None and isinstance(exc, openai.APIConnectionError):
+        return True  # includes APITimeoutError
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def default_request_timeout() -> float:
+    """Per-request budget in seconds from POCKETCLINIC_REQUEST_TIMEOUT."""
+    return float(os.getenv("POCKETCLINIC_REQUEST_TIMEOUT", "60"))
+
+
+@contextmanager
+def request_deadline(seconds: float):
+    """Set the deadline that upstream calls made within this block derive from."""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time(cap: float) -> float:
+    """Seconds left on the current request deadline, never more than `cap`."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return cap
+    return max(0.0, min(cap, deadline - time.monotonic()))
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        """The p-th percentile, or None until enough samples are collected."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed: calls go through. After `failure_threshold` consecutive failures
+    it opens and rejects calls for `reset_timeout` seconds, then half-opens
+    and lets a single probe through; the probe's outcome closes or reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self):
+        """End a half-open probe without a verdict on upstream health."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._state = self.CLOSED
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class ResilientCall:
+    """
+    Guard for one upstream: per-call deadline, optional hedged second
+    attempt, and a circuit breaker.
+
+    `fn` is called as fn(timeout) with the seconds it has left, so it can
+    hand the same deadline to the SDK and not leave a thread stuck forever.
+    An attempt's clock starts when it gets a worker thread, so time spent
+    queued behind other calls is never blamed on the upstream.
+    When hedging is on and the first attempt is still running after the
+    upstream's p95 latency, a second attempt is started and whichever
+    finishes first wins. Only idempotent calls should be hedged.
+
+    Only errors `is_failure` accepts (upstream errors by default) count
+    towards the breaker; anything else is re-raised as is.
+    """
+
+    def __init__(self, name: str, timeout: float = 30.0, hedge: bool = False,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 passthrough: tuple[type[BaseException], ...] = (), max_workers: int = 8,
+                 is_failure=is_upstream_error):
+        self.name = name
+        self.timeout = timeout
+        self.hedge = hedge
+        # Exceptions that are the caller's own doing and say nothing about upstream health
+        self.passthrough = passthrough
+        self.is_failure = is_failure
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"resilient-{name}")
+        self._lock = threading.Lock()
+        self.counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "saturated": 0,
+            "rejected": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+        }
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counters[key] += 1
+
+    def _submit(self, fn, timeout: float):
+        # Attempts run on pool threads; carry the request deadline over to them
+        ctx = contextvars.copy_context()
+        attempt = {"started": None, "budget": timeout}
+
+        def run():
+            attempt["budget"] = remaining_time(timeout)
+            attempt["started"] = time.monotonic()
+            return fn(attempt["budget"])
+
+        return self._executor.submit(ctx.run, run), attempt
+
+    def call(self, fn, timeout: float | None = None):
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError(f"{self.name}: circuit open")
+
+        budget = remaining_time(self.timeout if timeout is None else timeout)
+        end = time.monotonic() + budget
+        future, attempt = self._submit(fn, budget)
+        attempts = {future: ("primary", attempt)}
+
+        delay = self.latency.percentile(95) if self.hedge else None
+        if delay is not None and delay < budget:
+            done, _ = wait(attempts, timeout=delay)
+            if not done:
+                future, attempt = self._submit(fn, budget)
+                attempts[future] = ("hedge", attempt)
+                self._count("hedges")
+
+        error: BaseException | None = None
+        while attempts:
+            # Running attempts get their full budget from when they started;
+            # if none has started by `end`, the pool is saturated
+            started = [a["started"] + a["budget"] for _, a in attempts.values() if a["started"] is not None]
+            left = max(started, default=end) - time.monotonic()
+            if left <= 0:
+                break
+            done, _ = wait(attempts, timeout=left, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, attempt = attempts.pop(future)
+                exc = future.exception()
+                if exc is None:
+                    self.latency.record(time.monotonic() - attempt["started"])
+                    self.breaker.record_success()
+                    self._count("successes")
+                    if kind == "hedge":
+                        self._count("hedge_wins")
+                    return future.result()
+                if isinstance(exc, self.passthrough) or not self.is_failure(exc):
+                    self.breaker.release()
+                    raise exc
+                error = exc
+
+        if attempts:
+            ran = any(a["started"] is not None for _, a in attempts.values())
+            for future in attempts:
+                future.cancel()  # drop attempts still waiting for a thread
+            if not ran:
+                self.breaker.release()
+                self._count("saturated")
+                raise DeadlineExceeded(f"{self.name}: no worker free within {budget:.1f}s")
+        self.breaker.record_failure()
+        if attempts or error is None:
+            self._count("timeouts")
+            raise DeadlineExceeded(f"{self.name}: no response within {budget:.1f}s")
+        self._count("failures")
+        raise error
+
+    def stats(self) -> dict:
+        p95 = self.latency.percentile(95)
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            **counters,
+        }
+
+
+_guards: dict[str, ResilientCall] = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(name: str, **kwargs) -> ResilientCall:
+    """Shared guard per upstream name; kwargs only apply on first creation."""
+    with _guards_lock:
+        if name not in _guards:
+            _guards[name] = ResilientCall(name, **kwargs)
+        return _guards[name]
+
+
+def snapshot() -> dict:
+    """Breaker state and counters for every upstream guard."""
+    with _guards_lock:
+        guards = list(_guards.values())
+    return {g.name: g.stats() for g in guards}
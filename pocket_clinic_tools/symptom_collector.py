@@ -3,11 +3,52 @@ import re
 import tempfile
 import base64
 from crewai.tools import tool
-from openai import OpenAI
+from openai import BadRequestError, OpenAI, UnprocessableEntityError
 from dotenv import load_dotenv
+from pocket_clinic_tools.audio_utils import transcribe_offline
+from pocket_clinic_tools.fuzzy_matcher import FuzzyTermMatcher
+from pocket_clinic_tools.resilience import get_guard
 
 load_dotenv()
-_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Deadlines and retries are handled by the transcription guard
+_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+_matcher = FuzzyTermMatcher()  # deletion index is built once at import
+# Transcription is idempotent, so slow attempts are hedged. A 400/422 for
+# audio the API can't decode is about the clip, not the upstream, so it
+# passes through without tripping the breaker.
+_transcription = get_guard(
+    "transcription", timeout=30.0, hedge=True,
+    passthrough=(BadRequestError, UnprocessableEntityError),
+)
+
+
+def _transcribe(audio_clip: bytes, timeout: float) -> str:
+    return _client.audio.transcriptions.create(
+        model="gpt-4o-transcribe",  # ✅ This is the correct model
+        file=("audio.wav", audio_clip),
+        response_format="text",
+        timeout=timeout,
+    )
+
+
+def transcribe_audio(audio_clip: bytes) -> str | None:
+    """
+    Transcribe a voice clip with OpenAI, falling back to offline Vosk when
+    the upstream is slow, failing or its circuit is open.
+    Returns None when neither is available.
+    """
+    try:
+        return _transcription.call(lambda timeout: _transcribe(audio_clip, timeout))
+    except Exception as e:
+        print(f"[WARN] Transcription failed ({e}); trying offline transcription")
+
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+        tmp.write(audio_clip)
+        tmp_path = tmp.name
+    try:
+        return transcribe_offline(tmp_path)
+    finally:
+        os.remove(tmp_path)  # ✅ Clean up temp file
 
 @tool("Collect Symptoms")
 def collect_symptoms(audio_clip: bytes | None = None, text_message: str | None = None) -> dict:
@@ -19,7 +60,9 @@ def collect_symptoms(audio_clip: bytes | None = None, text_message: str | None =
     Returns:
         A dict with keys:
             fever (bool), cough (bool), difficulty_breathing (bool),
-            diarrhea (bool), duration_days (int when present)
+            diarrhea (bool), duration_days (int when present),
+            confidence (dict of detected symptom -> match confidence in (0, 1];
+                        1.0 for exact matches, lower for misspellings)
     """
     transcript = None
 
@@ -28,20 +71,9 @@ def collect_symptoms(audio_clip: bytes | None = None, text_message: str | None =
         if isinstance(audio_clip, str):
             audio_clip = base64.b64decode(audio_clip)
 
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-            tmp.write(audio_clip)
-            tmp_path = tmp.name
-
-        try:
-            with open(tmp_path, "rb") as audio_file:
-                resp = _client.audio.transcriptions.create(
-                    model="gpt-4o-transcribe",  # ✅ This is the correct model
-                    file=audio_file,
-                    response_format="text"
-                )
-                transcript = resp
-        finally:
-            os.remove(tmp_path)  # ✅ Clean up temp file
+        transcript = transcribe_audio(audio_clip)
+        if transcript is None:
+            return {"error": "Transcription unavailable."}
     elif text_message:
         transcript = text_message
     else:
@@ -68,4 +100,15 @@ def collect_symptoms(audio_clip: bytes | None = None, text_message: str | None =
             if key != "duration_days":
                 symptoms[key] = False
 
+    confidence = {key: 1.0 for key, value in symptoms.items() if value is True}
+
+    # 3) Fuzzy fallback for misspellings the regexes miss ("feaver", "diarhea")
+    fuzzy = _matcher.match(transcript)
+    for key, score in fuzzy.items():
+        if not symptoms.get(key):
+            print(f"[DEBUG] Fuzzy match: {key} (confidence {score:.2f})")
+            symptoms[key] = True
+            confidence[key] = round(score, 2)
+
+    symptoms["confidence"] = confidence
     return symptoms
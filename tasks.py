@@ -1,11 +1,34 @@
 from crewai import Task
 from textwrap import dedent
+from token_budget import compact_json
 
 class PocketClinicTasks:
+    def __init__(self, compact=False):
+        # Compact mode drops the markdown boilerplate and passes parameters as
+        # JSON; unset parameters (e.g. outputs of earlier tasks, which the crew
+        # already forwards as context) are left out entirely.
+        self.compact = compact
+
     def __tip_section(self):
         return "Deliver accurate results quickly—this directly impacts patient outcomes!"
 
+    def __compact_task(self, agent, instruction, expected_output, **params):
+        params = {k: v for k, v in params.items() if v is not None}
+        return Task(
+            description=f"{instruction} Input: {compact_json(params)}",
+            expected_output=expected_output,
+            agent=agent,
+        )
+
     def collect_symptoms_task(self, agent, text_message, audio_clip_b64):
+        if self.compact:
+            return self.__compact_task(
+                agent,
+                "Call Collect Symptoms with this input.",
+                "Symptom JSON from the tool.",
+                text_message=text_message,
+                audio_clip=audio_clip_b64,
+            )
         return Task(
             description=dedent(f"""
                 **Task**: Collect Symptoms
@@ -23,6 +46,13 @@ class PocketClinicTasks:
         )
 
     def triage_decision_task(self, agent, symptoms):
+        if self.compact:
+            return self.__compact_task(
+                agent,
+                "Call Triage Symptoms with the collected symptoms.",
+                'JSON {"urgency","recommendation"} from the tool.',
+                symptoms=symptoms,
+            )
         return Task(
             description=dedent(f"""
                 **Task**: Triage Decision
@@ -42,6 +72,14 @@ class PocketClinicTasks:
         )
 
     def dispatch_referral_task(self, agent, phone_number, triage_summary):
+        if self.compact:
+            return self.__compact_task(
+                agent,
+                "Call Dispatch Referral via SMS with the triage result as triage_summary.",
+                "The tool's result string.",
+                phone_number=phone_number,
+                triage_summary=triage_summary,
+            )
         return Task(
             description=dedent(f"""
                 **Task**: Dispatch Referral
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import sys
+import os
+import timeit
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import encoding
+from api.encoding import JSON, MSGPACK
+
+# A full /api/v1/process response as the gateway receives it today
+FULL = {
+    "status": "success",
+    "message": "Request processed successfully",
+    "details": {
+        "result": {
+            "symptoms": {"fever": True, "cough": True, "difficulty_breathing": False, "diarrhea": False, "duration_days": 3},
+            "triage": {"urgency": "moderate", "recommendation": "Visit a clinic if symptoms persist more than 2 days."},
+            "referral": "Referral sent to +2348012345678. SID: SM0123456789abcdef0123456789abcdef",
+            "fallback": None,
+        },
+        "usage": {
+            "budget": 4000, "estimated_prompt_tokens": 612, "prompt_tokens": 2304, "completion_tokens": 187,
+            "total_tokens": 2491,
+            "by_agent": {
+                "Symptom Collector Agent": {"prompt_tokens": 801, "completion_tokens": 64},
+                "Triage Decision Agent": {"prompt_tokens": 744, "completion_tokens": 58},
+                "Referral Dispatcher Agent": {"prompt_tokens": 759, "completion_tokens": 65},
+            },
+            "calls": [],
+        },
+    },
+}
+# Prefer: return=minimal
+MINIMAL = {"s": "success", "u": 2, "id": "SM0123456789abcdef0123456789abcdef"}
+RUNS = 5000
+
+
+def row(label, data, media_type, coding, baseline=None):
+    body, used = encoding.encode(data, media_type, coding)
+    seconds = timeit.timeit(lambda: encoding.encode(data, media_type, coding), number=RUNS) / RUNS
+    share = f"{len(body) / baseline:5.0%}" if baseline else "     "
+    print(f"{label:30} {len(body):6} B {share}  {seconds * 1e6:7.1f} µs  ({used})")
+    return len(body)
+
+
+if __name__ == "__main__":
+    print(f"{'Response encoding':30} {'bytes':>8} {'share':>5}  {'encode':>10}")
+    baseline = row("JSON (current)", FULL, JSON, "identity")
+    for label, data, media_type, coding in [
+        ("JSON + gzip", FULL, JSON, "gzip"),
+        ("JSON + zstd", FULL, JSON, "zstd"),
+        ("MessagePack", FULL, MSGPACK, "identity"),
+        ("MessagePack + gzip", FULL, MSGPACK, "gzip"),
+        ("MessagePack + zstd", FULL, MSGPACK, "zstd"),
+        ("Minimal profile, JSON", MINIMAL, JSON, "identity"),
+        ("Minimal profile, MessagePack", MINIMAL, MSGPACK, "identity"),
+    ]:
+        row(label, data, media_type, coding, baseline)
+
+    sample_dir = Path(__file__).parent / "audio_samples"
+    print("\nAudio upload body")
+    for wav in sorted(sample_dir.glob("*.wav")):
+        raw = wav.read_bytes()
+        for coding in ("gzip", "zstd"):
+            seconds = timeit.timeit(lambda raw=raw, coding=coding: encoding.compress(raw, coding), number=5) / 5
+            size = len(encoding.compress(raw, coding))
+            print(f"{wav.name:20} {coding:5} {len(raw):9} -> {size:9} B ({size / len(raw):4.0%})  {seconds * 1e3:6.1f} ms")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+import sys
+import os
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pocket_clinic_tools.fuzzy_matcher import FuzzyTermMatcher, _TOKEN_RE
+
+MESSAGES = [
+    "Patient has had a feaver and cof for 4 days.",
+    "Complains of diarhea for 1 day and shortnes of breath.",
+    "Child very hot, coughng at night, loose stools since monday.",
+    "No notable symptoms.",
+    "Amina Bello 08034567890 Kofar Mata ward, fever 39.5 since tuesday night",
+    "Mama Chinedu say pikin dey hot well well, no chop since yesterday",
+]
+
+if __name__ == "__main__":
+    tokens = sum(len(_TOKEN_RE.findall(m.lower())) for m in MESSAGES)
+    runs = 2000
+
+    matcher = FuzzyTermMatcher()
+    build = timeit.timeit(FuzzyTermMatcher, number=50) / 50
+
+    # Cold: LRU cleared every pass, so each token probes the index
+    def cold_lookup():
+        matcher.lookup.cache_clear()
+        for msg in MESSAGES:
+            matcher.match(msg)
+
+    def warm_lookup():
+        for msg in MESSAGES:
+            matcher.match(msg)
+
+    cold_s = timeit.timeit(cold_lookup, number=runs)
+    warm_s = timeit.timeit(warm_lookup, number=runs)
+
+    print(f"Index build:        {build * 1e3:.2f} ms")
+    print(f"Cold per token:     {cold_s / (runs * tokens) * 1e6:.2f} µs")
+    print(f"Warm per token:     {warm_s / (runs * tokens) * 1e6:.2f} µs")
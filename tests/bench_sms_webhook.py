@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import sys
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.sms_queue import SmsQueue
+from twilio.request_validator import RequestValidator
+
+# Webhook endpoint of a running server (python server.py)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "http://localhost:8000/webhooks/sms")
+MESSAGES = 2000
+CONCURRENCY = 32
+
+
+def bench_enqueue():
+    """Raw enqueue rate with no HTTP in front: memory path, then spill path"""
+    spill = os.path.join(tempfile.mkdtemp(), "spill.jsonl")
+    for label, maxsize in (("in-memory", MESSAGES * 10), ("spill to disk", 0)):
+        queue = SmsQueue(lambda m: None, maxsize=maxsize, spill_path=spill, workers=0)
+        start = time.perf_counter()
+        for i in range(MESSAGES * 10):
+            queue.put("+2348012345678", f"fever and cof for {i % 7} days")
+        elapsed = time.perf_counter() - start
+        print(f"Enqueue ({label}): {MESSAGES * 10 / elapsed:,.0f} msg/s")
+        queue.stop()
+        os.remove(spill)
+
+
+def bench_webhook():
+    """Sustained webhook acknowledgements per second against a live server"""
+    params = {"From": "+2348012345678", "Body": "feaver and cof for 2 days"}
+    body = urllib.parse.urlencode(params).encode()
+    # Sign like Twilio does; the server must share TWILIO_TOKEN
+    signature = RequestValidator(os.getenv("TWILIO_TOKEN", "")).compute_signature(WEBHOOK_URL, params)
+
+    def post(_):
+        req = urllib.request.Request(WEBHOOK_URL, data=body, headers={
+            "Content-Type": "application/x-www-form-urlencoded",
+            "X-Twilio-Signature": signature,
+        })
+        start = time.perf_counter()
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            resp.read()
+        return time.perf_counter() - start
+
+    try:
+        post(0)
+    except (urllib.error.URLError, ConnectionError) as e:
+        print(f"Skipping webhook benchmark, server not reachable at {WEBHOOK_URL}: {e}")
+        return
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        latencies = sorted(pool.map(post, range(MESSAGES)))
+    elapsed = time.perf_counter() - start
+    print(f"Webhook acks: {MESSAGES / elapsed:,.0f}/s with {CONCURRENCY} concurrent senders")
+    print(f"Ack latency p50: {latencies[len(latencies) // 2] * 1e3:.1f} ms, "
+          f"p99: {latencies[int(len(latencies) * 0.99)] * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    bench_enqueue()
+    bench_webhook()
@@ -0,0 +1,173 @@
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from pocket_clinic_tools.resilience import CircuitBreaker, ResilientCall
+from token_budget import TokenBudgetExceeded
+
+ROLES = ["Symptom Collector Agent", "Triage Decision Agent", "Referral Dispatcher Agent"]
+STEPS_PER_TASK = 2
+
+# Every referral SMS, from the crew's dispatcher or the rule-based fallback
+sent: list[str] = []
+
+
+class FakeAgents:
+    def __init__(self, **_kwargs):
+        pass
+
+    def _agent(self, role):
+        return SimpleNamespace(role=role, backstory="", goal="", llm=SimpleNamespace(timeout=None))
+
+    def symptom_collector_agent(self):
+        return self._agent(ROLES[0])
+
+    def triage_decision_agent(self):
+        return self._agent(ROLES[1])
+
+    def referral_dispatcher_agent(self):
+        return self._agent(ROLES[2])
+
+
+class FakeTasks:
+    def __init__(self, **_kwargs):
+        pass
+
+    def _task(self, agent, name):
+        return SimpleNamespace(agent=agent, description=name, expected_output="", output=None)
+
+    def collect_symptoms_task(self, agent, **_params):
+        return self._task(agent, "collect")
+
+    def triage_decision_task(self, agent, **_params):
+        return self._task(agent, "triage")
+
+    def dispatch_referral_task(self, agent, **_params):
+        return self._task(agent, "dispatch")
+
+
+class FakeCrew:
+    """
+    Runs the tasks in order like a sequential crew: each step spends
+    `tokens_per_step` and sleeps `delays[task]`, then calls the step callback.
+    The dispatcher's first step sends the SMS, as the tool runs before the
+    step callback.
+    """
+    tokens_per_step = 100
+    delays: dict[str, float] = {}
+    kickoffs = 0
+
+    def __init__(self, agents, tasks, verbose, step_callback, task_callback):
+        self.tasks = tasks
+        self.step_callback = step_callback
+        self.task_callback = task_callback
+        self.tokens = 0
+
+    def calculate_usage_metrics(self):
+        return SimpleNamespace(prompt_tokens=self.tokens, completion_tokens=0)
+
+    def kickoff(self):
+        FakeCrew.kickoffs += 1
+        for task in self.tasks:
+            for step in range(STEPS_PER_TASK):
+                time.sleep(self.delays.get(task.description, 0))
+                self.tokens += self.tokens_per_step
+                if task.description == "dispatch" and step == 0:
+                    sent.append("crew")
+                self.step_callback(None)
+            self.task_callback(SimpleNamespace(agent=task.agent.role, description=task.description))
+        return "crew result"
+
+
+def _fallback_referral(**_kwargs):
+    sent.append("fallback")
+    return "Referral sent to +2348012345678. SID: SM1"
+
+
+main.PocketClinicAgents = FakeAgents
+main.PocketClinicTasks = FakeTasks
+main.Crew = FakeCrew
+main.collect_symptoms = SimpleNamespace(run=lambda **_kwargs: {"fever": True, "duration_days": 2})
+main.triage_symptoms = SimpleNamespace(run=lambda **_kwargs: {"urgency": "low", "recommendation": "Rest."})
+main.send_referral = SimpleNamespace(run=_fallback_referral)
+
+
+def run_crew(tokens_per_step=100, delays=None, token_budget=None, request_timeout=5.0, llm=None):
+    sent.clear()
+    FakeCrew.tokens_per_step = tokens_per_step
+    FakeCrew.delays = delays or {}
+    main._llm = llm or ResilientCall("llm-test", timeout=5.0, passthrough=(TokenBudgetExceeded,))
+    crew = main.PocketClinicCrew(
+        text_message="fever for 2 days",
+        phone_number="+2348012345678",
+        token_budget=token_budget,
+        request_timeout=request_timeout,
+    )
+    return crew, crew.run()
+
+
+def test_budget_abort_falls_back_and_reports_aborted_tokens():
+    # 500 tokens a step: over 1200 on the triage task's first step
+    crew, result = run_crew(tokens_per_step=500, token_budget=1200)
+    usage = crew.usage
+    print("Usage after budget abort:", usage)
+    assert result["fallback"].startswith("Token budget exceeded")
+    assert sent == ["fallback"]
+    assert usage["total_tokens"] > 1200
+    assert usage["calls"][-1] == {
+        "agent": ROLES[1], "task": "aborted", "prompt_tokens": 500, "completion_tokens": 0,
+    }
+
+
+def test_budget_is_enforced_during_dispatch_without_a_second_sms():
+    # Over 2500 on the dispatcher's second step, after its SMS went out
+    crew, result = run_crew(tokens_per_step=500, token_budget=2500)
+    print("Budget abort during dispatch:", result)
+    assert "referral may still be delivered" in result["error"]
+    assert sent == ["crew"]
+    assert crew.usage["calls"][-1]["agent"] == ROLES[2]
+    assert crew.usage["total_tokens"] == 3000
+
+
+def test_timeout_before_triage_finishes_falls_back_once():
+    # Triage steps take 0.3s, so the 0.4s deadline passes mid-triage
+    _crew, result = run_crew(delays={"triage": 0.3}, request_timeout=0.4)
+    print("Timeout before dispatch:", result)
+    assert "no response" in result["fallback"]
+    time.sleep(0.6)  # let the abandoned crew thread reach its next callback
+    assert sent == ["fallback"], "abandoned crew must not dispatch"
+
+
+def test_timeout_after_dispatch_started_does_not_send_twice():
+    # The dispatcher sends its SMS at 0.3s and is still running at the deadline
+    _crew, result = run_crew(delays={"dispatch": 0.3}, request_timeout=0.4)
+    print("Timeout during dispatch:", result)
+    assert "referral may still be delivered" in result["error"]
+    assert result["cause"] == "deadline"
+    time.sleep(0.6)
+    assert sent == ["crew"]
+
+
+def test_open_circuit_goes_straight_to_fallback():
+    llm = ResilientCall("llm-open", failure_threshold=1, reset_timeout=60)
+    llm.breaker.record_failure()
+    assert llm.breaker.state == CircuitBreaker.OPEN
+
+    kickoffs = FakeCrew.kickoffs
+    _crew, result = run_crew(llm=llm)
+    assert "circuit open" in result["fallback"]
+    assert FakeCrew.kickoffs == kickoffs
+    assert sent == ["fallback"]
+
+
+if __name__ == "__main__":
+    test_budget_abort_falls_back_and_reports_aborted_tokens()
+    test_budget_is_enforced_during_dispatch_without_a_second_sms()
+    test_timeout_before_triage_finishes_falls_back_once()
+    test_timeout_after_dispatch_started_does_not_send_twice()
+    test_open_circuit_goes_straight_to_fallback()
+    print("All crew fallback tests passed.")
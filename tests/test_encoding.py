@@ -0,0 +1,140 @@
+import sys
+import os
+import asyncio
+import gzip
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import encoding
+from api.encoding import JSON, MSGPACK, CompactRequestMiddleware, EncodingError, UnsupportedEncoding
+
+RESPONSE = {
+    "status": "success",
+    "message": "Request processed successfully",
+    "details": {"result": "Referral sent to +2348012345678. SID: SM" + "0" * 32, "notes": "x" * 300},
+}
+
+
+def test_negotiation():
+    assert encoding.negotiate("", "") == (JSON, "identity")
+    assert encoding.negotiate("application/msgpack", "gzip") == (MSGPACK, "gzip")
+    assert encoding.negotiate("application/x-msgpack, application/json;q=0.5", "zstd, gzip")[1] == "zstd"
+    assert encoding.negotiate("application/json", "zstd;q=0, gzip") == (JSON, "gzip")
+    assert encoding.negotiate("application/msgpack;q=0.000", "zstd; q=0.00, gzip") == (JSON, "gzip")
+
+
+def test_round_trip_every_combination():
+    for media_type in (JSON, MSGPACK):
+        for coding in ("identity", "gzip", "zstd"):
+            body, used = encoding.encode(RESPONSE, media_type, coding)
+            print(f"{media_type:20} {coding:8} -> {len(body)} bytes")
+            assert used == coding
+            assert encoding.decode(body, media_type, used) == RESPONSE
+
+
+def test_small_bodies_are_not_compressed():
+    body, used = encoding.encode({"s": "success", "u": 3, "id": "SM123"}, MSGPACK, "zstd")
+    assert used == "identity"
+    assert len(body) < 30
+
+
+def test_bad_bodies_are_rejected():
+    try:
+        encoding.decompress(b"br", "br")
+    except UnsupportedEncoding as e:
+        assert e.status_code == 415
+    else:
+        raise AssertionError("unknown coding accepted")
+
+    for coding in ("gzip", "zstd"):
+        bomb = encoding.compress(b"\0" * 10_000, coding)
+        try:
+            encoding.decompress(bomb, coding, limit=1000)
+        except EncodingError as e:
+            assert e.status_code == 400
+        else:
+            raise AssertionError(f"oversized {coding} body accepted")
+
+
+def test_multi_member_and_truncated_bodies():
+    gzipped = gzip.compress(b"fever ") + gzip.compress(b"and cough")
+    assert encoding.decompress(gzipped, "gzip") == b"fever and cough"
+    zstded = encoding.compress(b"fever ", "zstd") + encoding.compress(b"and cough", "zstd")
+    assert encoding.decompress(zstded, "zstd") == b"fever and cough"
+
+    # Streaming compressors don't record the frame size up front
+    stream = encoding.zstandard.ZstdCompressor(write_content_size=False).compressobj()
+    streamed = stream.compress(b"fever and cough" * 100) + stream.flush()
+    assert encoding.decompress(streamed, "zstd") == b"fever and cough" * 100
+
+    for body, coding in ((gzipped[:-4], "gzip"), (zstded[:-3], "zstd"), (streamed[:-3], "zstd")):
+        try:
+            encoding.decompress(body, coding)
+        except EncodingError as e:
+            assert e.status_code == 400
+        else:
+            raise AssertionError(f"truncated {coding} body accepted")
+
+
+def _run_middleware(body, headers, max_body_size):
+    sent = []
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def app(scope, receive, send):
+        raise AssertionError("oversized body reached the app")
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"content-encoding", b"gzip"), *headers]}
+    asyncio.run(CompactRequestMiddleware(app, max_body_size=max_body_size)(scope, receive, send))
+    return sent[0]["status"]
+
+
+def test_middleware_caps_compressed_body():
+    body = gzip.compress(os.urandom(2000))
+    assert _run_middleware(body, [(b"content-length", str(len(body)).encode())], 1000) == 413
+    # Chunked uploads carry no Content-Length; the cap applies while reading
+    assert _run_middleware(body, [], 1000) == 413
+
+
+def test_middleware_rewrites_compressed_msgpack_to_json():
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["headers"] = dict(scope["headers"])
+        seen["body"] = (await receive())["body"]
+
+    body, _ = encoding.encode({"text_message": "feaver", "phone_number": "+2348012345678"}, MSGPACK)
+    body = encoding.compress(body, "zstd")
+    messages = [
+        {"type": "http.request", "body": body[:4], "more_body": True},
+        {"type": "http.request", "body": body[4:], "more_body": False},
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {"type": "http", "headers": [
+        (b"content-type", MSGPACK.encode()), (b"content-encoding", b"zstd"), (b"content-length", b"1"),
+    ]}
+    asyncio.run(CompactRequestMiddleware(app)(scope, receive, None))
+
+    assert seen["headers"][b"content-type"] == JSON.encode()
+    assert b"content-encoding" not in seen["headers"]
+    assert int(seen["headers"][b"content-length"]) == len(seen["body"])
+    assert encoding.decode(seen["body"]) == {"text_message": "feaver", "phone_number": "+2348012345678"}
+
+
+if __name__ == "__main__":
+    test_negotiation()
+    test_round_trip_every_combination()
+    test_small_bodies_are_not_compressed()
+    test_bad_bodies_are_rejected()
+    test_multi_member_and_truncated_bodies()
+    test_middleware_caps_compressed_body()
+    test_middleware_rewrites_compressed_msgpack_to_json()
+    print("All encoding tests passed.")
@@ -0,0 +1,48 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pocket_clinic_tools.fuzzy_matcher import FuzzyTermMatcher
+
+matcher = FuzzyTermMatcher()
+
+
+def test_misspellings_match():
+    """Common SMS misspellings resolve to the right symptom"""
+    cases = {
+        "Child has feaver since morning": "fever",
+        "cof and catarrh": "cough",
+        "diarhea for 2 days": "diarrhea",
+        "shortnes of breath at night": "difficulty_breathing",
+        "high temprature": "fever",
+    }
+    for text, key in cases.items():
+        out = matcher.match(text)
+        print(f"INPUT: {text!r}\nOUTPUT: {out}")
+        assert key in out, text
+        assert 0.75 <= out[key] < 1.0 or key == "cough"
+
+
+def test_exact_match_has_full_confidence():
+    assert matcher.match("fever and cough") == {"fever": 1.0, "cough": 1.0}
+
+
+def test_no_false_positives():
+    """Common words a few edits from a symptom term are not symptoms"""
+    for text in [
+        "No notable symptoms.",
+        "tough week, rough road",
+        "the pot is not",
+        "fewer complaints today",
+        "sleeping on the couch",
+        "breathes normally in a temperate room",
+    ]:
+        assert matcher.match(text) == {}, text
+
+
+if __name__ == "__main__":
+    test_misspellings_match()
+    test_exact_match_has_full_confidence()
+    test_no_false_positives()
+    print("All fuzzy matcher tests passed.")
@@ -0,0 +1,169 @@
+import sys
+import os
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pocket_clinic_tools.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, ResilientCall, request_deadline,
+)
+
+
+class FaultInjectingHandler(BaseHTTPRequestHandler):
+    """Stub upstream: /ok?delay=s sleeps then answers 200, /fail answers 500"""
+    hits = 0
+
+    def do_GET(self):
+        FaultInjectingHandler.hits += 1
+        url = urlparse(self.path)
+        delay = float(parse_qs(url.query).get("delay", ["0"])[0])
+        time.sleep(delay)
+        status = 500 if url.path == "/fail" else 200
+        try:
+            self.send_response(status)
+            self.end_headers()
+            self.wfile.write(b"ok" if status == 200 else b"boom")
+        except BrokenPipeError:
+            pass  # client gave up on a delayed response
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FaultInjectingHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+BASE = f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def fetch(path):
+    def attempt(timeout):
+        with urllib.request.urlopen(BASE + path, timeout=timeout) as resp:
+            return resp.read().decode()
+    return attempt
+
+
+def test_deadline_cuts_off_a_stuck_upstream():
+    guard = ResilientCall("stuck", timeout=0.2)
+    start = time.monotonic()
+    try:
+        guard.call(fetch("/ok?delay=2"))
+    except DeadlineExceeded:
+        pass
+    else:
+        raise AssertionError("stuck call was not cut off")
+    elapsed = time.monotonic() - start
+    print(f"Deadline hit after {elapsed:.2f}s, stats: {guard.stats()}")
+    assert elapsed < 0.5
+    assert guard.stats()["timeouts"] == 1
+
+
+def test_request_deadline_caps_call_timeout():
+    guard = ResilientCall("capped", timeout=5.0)
+    start = time.monotonic()
+    with request_deadline(0.2):
+        try:
+            guard.call(fetch("/ok?delay=2"))
+        except DeadlineExceeded:
+            pass
+    assert time.monotonic() - start < 0.5
+
+
+def test_hedge_wins_when_primary_is_slow():
+    guard = ResilientCall("hedged", timeout=3.0, hedge=True)
+    for _ in range(guard.latency.min_samples):
+        assert guard.call(fetch("/ok?delay=0.01")) == "ok"
+
+    # The first attempt hits a slow replica, the hedge a healthy one
+    paths = iter(["/ok?delay=2", "/ok?delay=0.01"])
+    start = time.monotonic()
+    result = guard.call(lambda timeout: fetch(next(paths))(timeout))
+    elapsed = time.monotonic() - start
+    stats = guard.stats()
+    print(f"Hedged call took {elapsed:.2f}s, stats: {stats}")
+    assert result == "ok"
+    assert elapsed < 1.0
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    guard = ResilientCall("flaky", timeout=1.0, failure_threshold=3, reset_timeout=0.2)
+    for _ in range(3):
+        try:
+            guard.call(fetch("/fail"))
+        except Exception:
+            pass
+    assert guard.breaker.state == CircuitBreaker.OPEN
+
+    hits = FaultInjectingHandler.hits
+    try:
+        guard.call(fetch("/ok"))
+    except CircuitOpenError:
+        pass
+    else:
+        raise AssertionError("open breaker let a call through")
+    assert FaultInjectingHandler.hits == hits, "open breaker must not reach upstream"
+
+    time.sleep(0.25)
+    assert guard.breaker.state == CircuitBreaker.HALF_OPEN
+    assert guard.call(fetch("/ok")) == "ok"
+    stats = guard.stats()
+    print(f"Breaker stats: {stats}")
+    assert stats["state"] == CircuitBreaker.CLOSED
+    assert stats["failures"] == 3 and stats["rejected"] == 1
+
+
+def test_client_errors_do_not_open_the_breaker():
+    guard = ResilientCall("buggy", timeout=1.0, failure_threshold=2)
+
+    def bug(_timeout):
+        raise KeyError("tool bug")
+
+    for _ in range(3):
+        try:
+            guard.call(bug)
+        except KeyError:
+            pass
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+    assert guard.stats()["failures"] == 0
+
+
+def test_queueing_is_not_blamed_on_the_upstream():
+    # One worker: the second call waits for the first and its clock starts
+    # only when it gets the thread, so it still succeeds
+    guard = ResilientCall("busy", timeout=0.5, max_workers=1, failure_threshold=1)
+    first = threading.Thread(target=guard.call, args=(fetch("/ok?delay=0.3"),))
+    first.start()
+    time.sleep(0.05)
+    assert guard.call(fetch("/ok?delay=0.3")) == "ok"
+    first.join()
+
+    # A call that never gets a worker is rejected without opening the breaker
+    with request_deadline(0.1):
+        blocker = threading.Thread(target=guard.call, args=(fetch("/ok?delay=0.3"),))
+        blocker.start()
+        time.sleep(0.02)
+        try:
+            guard.call(fetch("/ok"))
+        except DeadlineExceeded:
+            pass
+        else:
+            raise AssertionError("queued call was not cut off")
+    blocker.join()
+    stats = guard.stats()
+    print(f"Saturation stats: {stats}")
+    assert stats["state"] == CircuitBreaker.CLOSED
+    assert stats["saturated"] == 1
+
+
+if __name__ == "__main__":
+    test_deadline_cuts_off_a_stuck_upstream()
+    test_request_deadline_caps_call_timeout()
+    test_hedge_wins_when_primary_is_slow()
+    test_breaker_opens_fails_fast_and_recovers()
+    test_client_errors_do_not_open_the_breaker()
+    test_queueing_is_not_blamed_on_the_upstream()
+    print("All resilience tests passed.")
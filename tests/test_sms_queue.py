@@ -0,0 +1,140 @@
+import sys
+import os
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.sms_queue import SmsQueue
+
+
+def _spill_path():
+    fd, path = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    os.remove(path)
+    return path
+
+
+def _wait_for(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_burst_spills_to_disk_and_drains_in_order():
+    """A burst larger than the memory bound spills, and all messages are handled FIFO"""
+    seen = []
+    release = threading.Event()
+
+    def handler(message):
+        release.wait()
+        seen.append(message["body"])
+
+    queue = SmsQueue(handler, maxsize=10, spill_path=_spill_path(), workers=1)
+    queue.start()
+    for i in range(50):
+        queue.put("+2348012345678", f"msg {i}")
+
+    stats = queue.stats()
+    print("During burst:", stats)
+    assert stats["spilled"] >= 39
+    assert os.path.getsize(queue.spill_path) > 0
+
+    release.set()
+    assert _wait_for(lambda: len(seen) == 50)
+    assert seen == [f"msg {i}" for i in range(50)]
+    assert queue.stats()["on_disk"] == 0
+    queue.stop()
+
+
+def test_queued_messages_survive_restart():
+    path = _spill_path()
+    queue = SmsQueue(lambda m: None, maxsize=5, spill_path=path, workers=0)
+    queue.start()
+    for i in range(8):
+        queue.put("+2348012345678", f"msg {i}")
+    queue.stop()
+
+    seen = []
+    restarted = SmsQueue(lambda m: seen.append(m["body"]), maxsize=5, spill_path=path, workers=1)
+    restarted.start()
+    assert _wait_for(lambda: len(seen) == 8)
+    assert seen == [f"msg {i}" for i in range(8)]
+    restarted.stop()
+
+
+def test_in_flight_message_survives_stop():
+    """A message still being handled when stop gives up is saved for the next start"""
+    path = _spill_path()
+    release = threading.Event()
+    queue = SmsQueue(lambda m: release.wait(), spill_path=path, workers=1)
+    queue.start()
+    queue.put("+2348012345678", "slow triage")
+    assert _wait_for(lambda: queue.stats()["in_flight"] == 1)
+    queue.stop(timeout=0.1)
+    release.set()
+
+    seen = []
+    restarted = SmsQueue(lambda m: seen.append(m["body"]), spill_path=path, workers=1)
+    restarted.start()
+    assert _wait_for(lambda: seen == ["slow triage"])
+    restarted.stop()
+
+
+def test_second_queue_does_not_share_the_spill_file():
+    path = _spill_path()
+    first = SmsQueue(lambda m: None, maxsize=0, spill_path=path, workers=0)
+    second = SmsQueue(lambda m: None, maxsize=0, spill_path=path, workers=0)
+    first.put("+2348012345678", "fever")
+    second.put("+2348012345678", "cough")
+    print("Spill paths:", first.spill_path, second.spill_path)
+    assert first.spill_path == path and second.spill_path != path
+    assert first.stats()["on_disk"] == 1 and second.stats()["on_disk"] == 1
+    pid_path = second.spill_path
+    first.stop()
+    second.stop()
+    os.remove(pid_path)
+
+
+def test_restart_adopts_pid_suffixed_spill():
+    """Messages a queue spilled to its per-process file are handled after a restart"""
+    path = _spill_path()
+    holder = SmsQueue(lambda m: None, maxsize=0, spill_path=path, workers=0)
+    holder.put("+2348012345678", "held by A")
+    other = SmsQueue(lambda m: None, maxsize=0, spill_path=path, workers=0)
+    other.put("+2348012345679", "fever from B")
+    pid_path = other.spill_path
+    other.stop()
+    holder.stop()
+    assert os.path.exists(pid_path)
+
+    seen = []
+    restarted = SmsQueue(lambda m: seen.append(m["body"]), spill_path=path, workers=1)
+    restarted.start()
+    assert _wait_for(lambda: len(seen) == 2)
+    assert seen == ["held by A", "fever from B"]
+    assert not os.path.exists(pid_path)
+    restarted.stop()
+
+
+def test_handler_errors_are_counted_not_raised():
+    def handler(message):
+        raise RuntimeError("upstream down")
+
+    queue = SmsQueue(handler, spill_path=_spill_path(), workers=1)
+    queue.start()
+    queue.put("+2348012345678", "fever")
+    assert _wait_for(lambda: queue.stats()["failed"] == 1)
+    queue.stop()
+
+
+if __name__ == "__main__":
+    test_burst_spills_to_disk_and_drains_in_order()
+    test_queued_messages_survive_restart()
+    test_in_flight_message_survives_stop()
+    test_second_queue_does_not_share_the_spill_file()
+    test_restart_adopts_pid_suffixed_spill()
+    test_handler_errors_are_counted_not_raised()
+    print("All SMS queue tests passed.")
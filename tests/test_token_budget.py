@@ -0,0 +1,58 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from token_budget import TokenLedger, TokenBudgetExceeded, compact_json, count_tokens
+
+
+def test_ledger_attributes_deltas_per_task():
+    """Cumulative crew counters are split into per-task records"""
+    ledger = TokenLedger()
+    ledger.record_delta("Symptom Collector Agent", "collect", 300, 40)
+    ledger.record_delta("Triage Decision Agent", "triage", 550, 70)
+    ledger.record_delta("Symptom Collector Agent", "collect again", 670, 80)
+
+    summary = ledger.summary()
+    print("Usage:", summary)
+    assert summary["calls"][1]["prompt_tokens"] == 250
+    assert summary["calls"][2]["prompt_tokens"] == 120
+    assert summary["calls"][2]["completion_tokens"] == 10
+    assert summary["by_agent"]["Symptom Collector Agent"] == {"prompt_tokens": 420, "completion_tokens": 50}
+    assert summary["total_tokens"] == 670 + 80
+
+
+def test_budget_is_enforced():
+    ledger = TokenLedger(budget=100)
+    ledger.record("Triage Decision Agent", "triage", 80, 10)
+    ledger.check()
+    ledger.record("Triage Decision Agent", "triage", 20, 0)
+    try:
+        ledger.check()
+    except TokenBudgetExceeded as e:
+        print("Budget tripped:", e)
+    else:
+        raise AssertionError("budget not enforced")
+
+
+def test_estimate_trips_budget_before_any_call():
+    ledger = TokenLedger(budget=10)
+    try:
+        ledger.estimate("x" * 400)
+    except TokenBudgetExceeded:
+        return
+    raise AssertionError("pre-flight estimate did not trip the budget")
+
+
+def test_compact_json_is_smaller_than_repr():
+    symptoms = {"fever": True, "cough": False, "difficulty_breathing": False, "diarrhea": True, "duration_days": 3}
+    print(f"repr: {count_tokens(repr(symptoms))} tokens, json: {count_tokens(compact_json(symptoms))} tokens")
+    assert len(compact_json(symptoms)) < len(repr(symptoms))
+
+
+if __name__ == "__main__":
+    test_ledger_attributes_deltas_per_task()
+    test_budget_is_enforced()
+    test_estimate_trips_budget_before_any_call()
+    test_compact_json_is_smaller_than_repr()
+    print("All token budget tests passed.")
@@ -0,0 +1,101 @@
+import json
+import os
+
+try:
+    import tiktoken
+    _encoding = tiktoken.encoding_for_model("gpt-4o")
+except Exception:  # tiktoken missing or no cached encoding offline
+    _encoding = None
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised when a triage request spends more tokens than its budget."""
+
+
+def count_tokens(text: str) -> int:
+    """Token count for `text`, falling back to ~4 chars/token without tiktoken."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def compact_json(value) -> str:
+    """Serialize task parameters as minimal JSON instead of Python reprs."""
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def default_token_budget() -> int | None:
+    """Per-request token budget from POCKETCLINIC_TOKEN_BUDGET (unset = unlimited)."""
+    value = os.getenv("POCKETCLINIC_TOKEN_BUDGET")
+    return int(value) if value else None
+
+
+class TokenLedger:
+    """
+    Per-call token accounting for one triage request.
+
+    Records prompt and completion tokens per agent and task, and enforces a
+    hard budget: `check()` raises TokenBudgetExceeded once the running total
+    goes over it.
+    """
+
+    def __init__(self, budget: int | None = None):
+        self.budget = budget
+        self.records: list[dict] = []
+        self.estimated_prompt_tokens = 0
+        self._snapshot = (0, 0)
+
+    def estimate(self, *texts: str) -> int:
+        """Pre-flight estimate of the static prompt (backstories, task descriptions)."""
+        self.estimated_prompt_tokens = sum(count_tokens(t) for t in texts)
+        self.check(self.estimated_prompt_tokens)
+        return self.estimated_prompt_tokens
+
+    def record(self, agent: str, task: str, prompt_tokens: int, completion_tokens: int):
+        self.records.append({
+            "agent": agent,
+            "task": task,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        })
+
+    def record_delta(self, agent: str, task: str, prompt_total: int, completion_total: int):
+        """Record usage from the crew's cumulative counters since the last record."""
+        prev_prompt, prev_completion = self._snapshot
+        self._snapshot = (prompt_total, completion_total)
+        self.record(agent, task, prompt_total - prev_prompt, completion_total - prev_completion)
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(r["prompt_tokens"] for r in self.records)
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(r["completion_tokens"] for r in self.records)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def check(self, spent: int | None = None):
+        spent = self.total_tokens if spent is None else spent
+        if self.budget is not None and spent > self.budget:
+            raise TokenBudgetExceeded(f"Token budget exceeded: {spent} > {self.budget}")
+
+    def summary(self) -> dict:
+        by_agent: dict[str, dict] = {}
+        for r in self.records:
+            totals = by_agent.setdefault(r["agent"], {"prompt_tokens": 0, "completion_tokens": 0})
+            totals["prompt_tokens"] += r["prompt_tokens"]
+            totals["completion_tokens"] += r["completion_tokens"]
+        return {
+            "budget": self.budget,
+            "estimated_prompt_tokens": self.estimated_prompt_tokens,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "by_agent": by_agent,
+            "calls": self.records,
+        }